@@ -2,8 +2,17 @@
 Centralized configuration for Reddit TLDR Bot.
 """
 
+import re
+
+
+def _combine_patterns(patterns: list[str]) -> re.Pattern:
+    """Join patterns into one case-insensitive alternation so text is scanned once."""
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
 # Subreddit configuration
 SUBREDDIT = "accelerate"
+SUBREDDIT_LC = SUBREDDIT.lower()  # For case-insensitive comparisons against display_name
 
 # TLDR Settings
 WORD_THRESHOLD = 270  # Minimum words to trigger TLDR
@@ -17,6 +26,7 @@ MAX_REPLIES_PER_RUN = 1  # Limit conversational replies per execution (runs are
 MAX_REPLIES_PER_DAY = 30  # Daily cap for conversational replies
 MAX_REPLY_WORDS = 75  # Target max words for conversational replies (keep it tight)
 MIN_REPLY_WORDS = 10  # Minimum words for replies (can be very short if appropriate)
+MAX_INCOMING_CHARS = 2000  # Longer comments/posts are cut to their first 80% + last 20% of this before prompting
 
 # Rate limiting
 SAME_USER_COOLDOWN_HOURS = 1  # Don't reply to same user within this window
@@ -26,12 +36,11 @@ MOD_CACHE_REFRESH_DAYS = 3  # Refresh moderator list from Reddit every N days
 # Summon detection patterns (case-insensitive)
 # These patterns will trigger the bot to respond
 SUMMON_PATTERNS = [
-    # Direct name mentions
-    r"\b(hey|hi|hello|yo|sup)\s+(optimist\s*prime)\b",
+    # Direct name mentions (also covers greetings like "hey optimist prime")
     r"\boptimist\s*prime\b",
     
     # Bot summons
-    r"\b(hey|hi|hello|yo|sup)\s+(bot|ai\s*bot|mod\s*bot|tldr\s*bot)\b",
+    r"\b(hey|hi|hello|yo|sup)\s+(ai\s*|mod\s*|tldr\s*)?bot\b",
     r"\b(summon|summoning|calling|paging)\s+(the\s+)?(bot|ai|optimist|optimist\s*prime)\b",
     
     # Mod bot references
@@ -46,6 +55,10 @@ SUMMON_PATTERNS = [
     # Explicit requests
     r"\b(ask|tell|get)\s+(the\s+)?(bot|ai|optimist)\b",
 ]
+# Compiled once at import so the handlers don't go through re's cache per call
+SUMMON_COMBINED_RE = _combine_patterns(SUMMON_PATTERNS)
+# Every summon match contains one of these (lowercase) substrings; keep in sync with the list above
+SUMMON_LITERAL_HINTS = ("bot", "optimist", "ai")
 
 # Patterns that indicate hostile/bad-faith comments to avoid
 HOSTILE_PATTERNS = [
@@ -56,11 +69,23 @@ HOSTILE_PATTERNS = [
     r"\bgo\s+away\b",
     r"\bnobody\s+(asked|cares)\b",
 ]
+HOSTILE_COMBINED_RE = _combine_patterns(HOSTILE_PATTERNS)
+# Every hostile match contains one of these (lowercase) substrings; keep in sync with the list above
+HOSTILE_LITERAL_HINTS = ("stupid", "dumb", "useless", "trash", "garbage", "fuck", "shut", "kill", "away", "nobody")
+
+# Summon + hostile in one pattern so a summon candidate is scanned once; named groups
+# tell the two apart (hostile first so it wins if both could start at the same spot)
+SUMMON_OR_HOSTILE_RE = re.compile(
+    f"(?P<hostile>{HOSTILE_COMBINED_RE.pattern})|(?P<summon>{SUMMON_COMBINED_RE.pattern})",
+    re.IGNORECASE,
+)
 
 # Bot identification patterns (to avoid responding to other bots)
+# Matched case-insensitively, so "Bot" and "AutoModerator" are covered by these
 BOT_INDICATORS = [
     r"bot\b",
-    r"Bot\b", 
     r"auto[\-_]?mod",
-    r"AutoModerator",
 ]
+BOT_INDICATORS_COMBINED_RE = _combine_patterns(BOT_INDICATORS)
+# Every bot indicator match contains one of these (lowercase) substrings; keep in sync with the list above
+BOT_LITERAL_HINTS = ("bot", "auto")
@@ -4,60 +4,22 @@ Generate a beautiful stats dashboard HTML page for GitHub Pages.
 
 import json
 import os
-from datetime import datetime
-
-def load_json(filepath, default):
-    """Load JSON file or return default."""
-    if os.path.exists(filepath):
-        try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return default
+from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:  # Optional speedup; the dashboard workflow runs without installing requirements
+    orjson = None
 
-def format_cost(cost):
-    """Format cost nicely."""
-    if cost < 0.01:
-        return f"${cost:.6f}"
-    elif cost < 1:
-        return f"${cost:.4f}"
-    else:
-        return f"${cost:.2f}"
-
-
-def generate_html():
-    """Generate the stats dashboard HTML."""
-    stats = load_json("data/stats.json", {
-        "total_tldrs": 0,
-        "total_tokens": 0,
-        "total_cost": 0.0,
-        "runs": 0,
-        "last_run": None
-    })
-    
-    state = load_json("data/tldr_state.json", {
-        "processed_posts": [],
-        "stats": {}
-    })
-    
-    last_run = stats.get("last_run", "Never")
-    if last_run and last_run != "Never":
-        try:
-            dt = datetime.fromisoformat(last_run.replace('Z', '+00:00'))
-            last_run = dt.strftime("%Y-%m-%d %H:%M UTC")
-        except:
-            pass
-    
-    html = f"""<!DOCTYPE html>
+# Static page head and CSS, written out verbatim
+_HTML_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Reddit TLDR Bot - Stats Dashboard</title>
     <style>
-        :root {{
+        :root {
             --bg-dark: #0d1117;
             --bg-card: #161b22;
             --border: #30363d;
@@ -66,82 +28,82 @@ def generate_html():
             --accent: #58a6ff;
             --success: #3fb950;
             --warning: #d29922;
-        }}
+        }
         
-        * {{
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Noto Sans', Helvetica, Arial, sans-serif;
             background: var(--bg-dark);
             color: var(--text-primary);
             min-height: 100vh;
             padding: 2rem;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 900px;
             margin: 0 auto;
-        }}
+        }
         
-        header {{
+        header {
             text-align: center;
             margin-bottom: 3rem;
-        }}
+        }
         
-        h1 {{
+        h1 {
             font-size: 2.5rem;
             margin-bottom: 0.5rem;
             background: linear-gradient(135deg, var(--accent), var(--success));
             -webkit-background-clip: text;
             -webkit-text-fill-color: transparent;
             background-clip: text;
-        }}
+        }
         
-        .subtitle {{
+        .subtitle {
             color: var(--text-secondary);
             font-size: 1.1rem;
-        }}
+        }
         
-        .stats-grid {{
+        .stats-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 1.5rem;
             margin-bottom: 2rem;
-        }}
+        }
         
-        .stat-card {{
+        .stat-card {
             background: var(--bg-card);
             border: 1px solid var(--border);
             border-radius: 12px;
             padding: 1.5rem;
             text-align: center;
             transition: transform 0.2s, box-shadow 0.2s;
-        }}
+        }
         
-        .stat-card:hover {{
+        .stat-card:hover {
             transform: translateY(-4px);
             box-shadow: 0 8px 24px rgba(0, 0, 0, 0.4);
-        }}
+        }
         
-        .stat-value {{
+        .stat-value {
             font-size: 2.5rem;
             font-weight: bold;
             color: var(--accent);
             margin-bottom: 0.5rem;
-        }}
+        }
         
-        .stat-label {{
+        .stat-label {
             color: var(--text-secondary);
             font-size: 0.9rem;
             text-transform: uppercase;
             letter-spacing: 0.05em;
-        }}
+        }
         
-        .status-bar {{
+        .status-bar {
             background: var(--bg-card);
             border: 1px solid var(--border);
             border-radius: 12px;
@@ -151,49 +113,52 @@ def generate_html():
             align-items: center;
             flex-wrap: wrap;
             gap: 1rem;
-        }}
+        }
         
-        .status-indicator {{
+        .status-indicator {
             display: flex;
             align-items: center;
             gap: 0.5rem;
-        }}
+        }
         
-        .status-dot {{
+        .status-dot {
             width: 12px;
             height: 12px;
             border-radius: 50%;
             background: var(--success);
             animation: pulse 2s infinite;
-        }}
+        }
         
-        @keyframes pulse {{
-            0%, 100% {{ opacity: 1; }}
-            50% {{ opacity: 0.5; }}
-        }}
+        @keyframes pulse {
+            0%, 100% { opacity: 1; }
+            50% { opacity: 0.5; }
+        }
         
-        .last-run {{
+        .last-run {
             color: var(--text-secondary);
-        }}
+        }
         
-        footer {{
+        footer {
             text-align: center;
             margin-top: 3rem;
             color: var(--text-secondary);
             font-size: 0.85rem;
-        }}
+        }
         
-        footer a {{
+        footer a {
             color: var(--accent);
             text-decoration: none;
-        }}
+        }
         
-        footer a:hover {{
+        footer a:hover {
             text-decoration: underline;
-        }}
+        }
     </style>
 </head>
-<body>
+"""
+
+# Dynamic part of the page, filled in by generate_html_body() with str.format
+_BODY_TEMPLATE = """<body>
     <div class="container">
         <header>
             <h1>🤖 Reddit TLDR Bot</h1>
@@ -202,22 +167,22 @@ def generate_html():
         
         <div class="stats-grid">
             <div class="stat-card">
-                <div class="stat-value">{stats.get('total_tldrs', 0)}</div>
+                <div class="stat-value">{total_tldrs}</div>
                 <div class="stat-label">TLDRs Generated</div>
             </div>
             
             <div class="stat-card">
-                <div class="stat-value">{stats.get('runs', 0):,}</div>
+                <div class="stat-value">{runs}</div>
                 <div class="stat-label">Bot Runs</div>
             </div>
             
             <div class="stat-card">
-                <div class="stat-value">{stats.get('total_tokens', 0):,}</div>
+                <div class="stat-value">{total_tokens}</div>
                 <div class="stat-label">Tokens Used</div>
             </div>
             
             <div class="stat-card">
-                <div class="stat-value">{format_cost(stats.get('total_cost', 0))}</div>
+                <div class="stat-value">{total_cost}</div>
                 <div class="stat-label">Total API Cost</div>
             </div>
         </div>
@@ -239,24 +204,82 @@ def generate_html():
                 <a href="https://reddit.com/r/accelerate">r/accelerate</a>
             </p>
             <p style="margin-top: 0.5rem;">
-                Page generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')}
+                Page generated: {generated}
             </p>
         </footer>
     </div>
 </body>
 </html>"""
+
+
+def load_json(filepath, default):
+    """Load JSON file (with orjson when available) or return default."""
+    try:
+        if orjson is not None:
+            with open(filepath, 'rb') as f:
+                return orjson.loads(f.read())
+        with open(filepath, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def format_cost(cost):
+    """Format cost nicely."""
+    if cost < 0.01:
+        return f"${cost:.6f}"
+    elif cost < 1:
+        return f"${cost:.4f}"
+    else:
+        return f"${cost:.2f}"
+
+
+def generate_html_body():
+    """Generate the dynamic <body> part of the stats dashboard."""
+    stats = load_json("data/stats.json", {
+        "total_tldrs": 0,
+        "total_tokens": 0,
+        "total_cost": 0.0,
+        "runs": 0,
+        "last_run": None
+    })
+    
+    state = load_json("data/tldr_state.json", {
+        "processed_posts": [],
+        "stats": {}
+    })
+    
+    last_run = stats.get("last_run", "Never")
+    if last_run and last_run != "Never":
+        try:
+            dt = datetime.fromisoformat(last_run.replace('Z', '+00:00'))
+            last_run = dt.strftime("%Y-%m-%d %H:%M UTC")
+        except:
+            pass
+    
+    generated = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
     
-    return html
+    return _BODY_TEMPLATE.format(
+        total_tldrs=stats.get('total_tldrs', 0),
+        runs=f"{stats.get('runs', 0):,}",
+        total_tokens=f"{stats.get('total_tokens', 0):,}",
+        total_cost=format_cost(stats.get('total_cost', 0)),
+        last_run=last_run,
+        generated=generated,
+    )
 
 
 def main():
     """Generate and save the stats page."""
     os.makedirs("docs", exist_ok=True)
     
-    html = generate_html()
+    # Format the body before opening the file so a failure can't leave a head-only page
+    body = generate_html_body()
     
-    with open("docs/index.html", "w", encoding="utf-8") as f:
-        f.write(html)
+    # Write the static head as-is; only the small body is formatted
+    with open("docs/index.html", "w", encoding="utf-8", buffering=65536) as f:
+        f.write(_HTML_HEAD)
+        f.write(body)
     
     print("✅ Generated docs/index.html")
 
@@ -0,0 +1,88 @@
+"""
+Shared helpers for the Optimist Prime bot's handlers.
+Bot filtering, age/cooldown checks and bounded ID histories used by the
+reply handler, the summon handler and the TLDR runner.
+"""
+
+from collections import deque
+from functools import lru_cache
+
+from config import (
+    MAX_AGE_HOURS,
+    BOT_INDICATORS_COMBINED_RE,
+    BOT_LITERAL_HINTS,
+    SAME_USER_COOLDOWN_HOURS,
+    SAME_USER_REPLIES_BEFORE_COOLDOWN,
+)
+
+# Config-derived limits in seconds, so the per-item checks compare timestamps directly
+MAX_AGE_SECONDS = MAX_AGE_HOURS * 3600
+COOLDOWN_SECONDS = SAME_USER_COOLDOWN_HOURS * 3600
+
+
+@lru_cache(maxsize=256)
+def _is_likely_bot_cached(author_name: str) -> bool:
+    """Username pattern check, memoized since the same authors recur within a run."""
+    name_lower = author_name.lower()
+    if not any(hint in name_lower for hint in BOT_LITERAL_HINTS):
+        return False
+    return BOT_INDICATORS_COMBINED_RE.search(author_name) is not None
+
+
+def is_likely_bot(author_name: str | None) -> bool:
+    """Check if an author is likely a bot based on username patterns."""
+    if not author_name:
+        return True  # Treat deleted users as bots
+    
+    return _is_likely_bot_cached(author_name)
+
+
+def is_too_old(created_utc: float, now: float) -> bool:
+    """Check if a comment/post is older than MAX_AGE_HOURS."""
+    return (now - created_utc) > MAX_AGE_SECONDS
+
+
+def check_user_cooldown(author_name: str | None, recent_replies: dict, now: float) -> bool:
+    """
+    Check if we've recently replied to this user too many times.
+    
+    Args:
+        author_name: The username to check
+        recent_replies: Dict of {username: {count: int, first_reply_time: float}}
+        now: Current Unix timestamp (taken once per run)
+    
+    Returns:
+        True if we should skip (user is on cooldown), False if OK to reply
+    """
+    if not author_name or author_name not in recent_replies:
+        return False
+    
+    user_data = recent_replies[author_name]
+    reply_count = user_data.get("count", 0)
+    first_reply_time = user_data.get("first_reply_time", 0)
+    
+    # If under the limit, allow reply
+    if reply_count < SAME_USER_REPLIES_BEFORE_COOLDOWN:
+        return False
+    
+    # Over limit - check if cooldown has expired
+    return (now - first_reply_time) < COOLDOWN_SECONDS
+
+
+def prune_recent_user_replies(recent_replies: dict, now: float) -> dict:
+    """Drop cooldown entries whose window has passed (they can't block a reply) so the persisted dict stays small."""
+    cutoff = now - COOLDOWN_SECONDS
+    return {
+        name: data for name, data in recent_replies.items()
+        if data.get("first_reply_time", 0) >= cutoff
+    }
+
+
+def mark_processed(item_id: str, order: deque, seen: set):
+    """Remember an ID, forgetting the oldest once the deque is full."""
+    if item_id in seen:
+        return
+    if len(order) == order.maxlen:
+        seen.discard(order[0])
+    order.append(item_id)
+    seen.add(item_id)
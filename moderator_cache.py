@@ -0,0 +1,61 @@
+"""
+Moderator list caching for the Optimist Prime bot.
+Shared by the reply and summon handlers so moderators can bypass user cooldowns.
+"""
+
+import time
+
+from config import MOD_CACHE_REFRESH_DAYS
+
+_MOD_CACHE_MAX_AGE = MOD_CACHE_REFRESH_DAYS * 24 * 3600
+
+# (moderator_cache refresh timestamp, lowercased moderator frozenset built from it)
+_MOD_SET_CACHE = None
+
+
+def _lowered_mod_set(mod_list: list, refreshed_at: float) -> frozenset:
+    """Return the lowercased moderator set, rebuilding only when the cache timestamp changes."""
+    global _MOD_SET_CACHE
+    if _MOD_SET_CACHE is None or _MOD_SET_CACHE[0] != refreshed_at:
+        _MOD_SET_CACHE = (refreshed_at, frozenset(m.lower() for m in mod_list))
+    return _MOD_SET_CACHE[1]
+
+
+def get_cached_moderators(state: dict, subreddit) -> frozenset:
+    """
+    Get moderator set from cache, refreshing from Reddit if stale.
+    Updates state in-place with cached data.
+    
+    The refresh runs on the calling thread (PRAW is not thread-safe); it only
+    happens once every MOD_CACHE_REFRESH_DAYS, so the occasional wait is fine.
+    """
+    now = time.time()
+    
+    cached_mods = state.get("moderator_cache", {})
+    last_refresh = cached_mods.get("last_refresh", 0)
+    mod_list = cached_mods.get("moderators", [])
+    
+    # Check if cache is fresh enough
+    if mod_list and (now - last_refresh) < _MOD_CACHE_MAX_AGE:
+        return _lowered_mod_set(mod_list, last_refresh)
+    
+    # Cache is stale or empty - refresh from Reddit
+    try:
+        fresh_mods = [mod.name for mod in subreddit.moderator()]
+        state["moderator_cache"] = {
+            "moderators": fresh_mods,
+            "last_refresh": now
+        }
+        print(f"    🔄 Refreshed moderator cache ({len(fresh_mods)} mods)")
+        return _lowered_mod_set(fresh_mods, now)
+    except Exception as e:
+        print(f"    ⚠️ Could not refresh mod cache: {e}")
+        # Return stale cache if available, otherwise empty
+        return _lowered_mod_set(mod_list, last_refresh)
+
+
+def is_moderator(author_name: str | None, mods: frozenset) -> bool:
+    """Check if a user is in the (lowercased) moderator set."""
+    if not author_name:
+        return False
+    return author_name.lower() in mods
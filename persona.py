@@ -3,8 +3,12 @@ Persona and response generation for the Optimist Prime bot.
 Handles conversational responses with the r/accelerate community voice.
 """
 
+import io
 import re
-from config import MAX_REPLY_WORDS, MIN_REPLY_WORDS
+from collections import deque
+from dataclasses import dataclass
+
+from config import MAX_REPLY_WORDS, MIN_REPLY_WORDS, MAX_INCOMING_CHARS
 
 # The core persona prompt for conversational responses
 ACCELERATE_PERSONA_PROMPT = """You are "Optimist Prime", a helpful AI assistant and beloved community member of r/accelerate.
@@ -56,6 +60,63 @@ ACCELERATE_PERSONA_PROMPT = """You are "Optimist Prime", a helpful AI assistant
 Just respond naturally as a community member would. No headers, no labels, no "Response:" prefix - just your conversational reply. Keep it tight and genuine. Short is usually better."""
 
 
+_REPLY_GENERATION_CONFIG = {
+    "temperature": 0.7,  # Slightly higher for more natural conversation
+    "max_output_tokens": 512
+}
+
+# Gemini 2.0 Flash pricing, per token
+_INPUT_COST_PER_TOKEN = 0.10 / 1_000_000
+_CACHED_INPUT_COST_PER_TOKEN = 0.025 / 1_000_000
+_OUTPUT_COST_PER_TOKEN = 0.40 / 1_000_000
+
+
+@dataclass(slots=True, frozen=True)
+class TokenInfo:
+    """Token usage and estimated cost of one Gemini call."""
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+    cost: float
+    cached_tokens: int = 0  # Part of input_tokens served from Gemini's context cache
+    
+    @classmethod
+    def from_response(cls, response) -> "TokenInfo":
+        """Read usage_metadata off a Gemini response (zeros if it's missing)."""
+        usage = getattr(response, 'usage_metadata', None)
+        input_tokens = usage.prompt_token_count if usage is not None else 0
+        output_tokens = usage.candidates_token_count if usage is not None else 0
+        # Older SDKs don't report cache hits; prompt_token_count already includes them
+        cached_tokens = (getattr(usage, 'cached_content_token_count', 0) or 0) if usage is not None else 0
+        return cls(
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            total_tokens=input_tokens + output_tokens,
+            cost=(
+                (input_tokens - cached_tokens) * _INPUT_COST_PER_TOKEN
+                + cached_tokens * _CACHED_INPUT_COST_PER_TOKEN
+                + output_tokens * _OUTPUT_COST_PER_TOKEN
+            ),
+            cached_tokens=cached_tokens,
+        )
+
+
+_SUMMON_NOTE = """
+**SPECIAL NOTE:** This user has summoned you directly. They're reaching out for your perspective or help. Be especially welcoming and helpful!
+"""
+
+_TARGET_LENGTH_AND_CONTEXT_HEADER = f"""
+**TARGET RESPONSE LENGTH:** Aim for {MIN_REPLY_WORDS}-{MAX_REPLY_WORDS} words. Be concise but substantive.
+
+---
+CONTEXT (use this to understand what the conversation is about):
+"""
+
+# Everything before the context is fixed per mode, so build both variants once
+_REPLY_PROMPT_PREFIX = f"{ACCELERATE_PERSONA_PROMPT}\n{_TARGET_LENGTH_AND_CONTEXT_HEADER}"
+_SUMMON_PROMPT_PREFIX = f"{ACCELERATE_PERSONA_PROMPT}\n{_SUMMON_NOTE}{_TARGET_LENGTH_AND_CONTEXT_HEADER}"
+
+
 def get_reply_prompt(incoming_text: str, context: str, is_summon: bool = False) -> str:
     """
     Build the full prompt for generating a conversational response.
@@ -65,38 +126,37 @@ def get_reply_prompt(incoming_text: str, context: str, is_summon: bool = False)
         context: Additional context (parent comments, post title, etc.)
         is_summon: Whether this is a direct summon vs a reply to bot's comment
     """
-    summon_note = ""
-    if is_summon:
-        summon_note = """
-**SPECIAL NOTE:** This user has summoned you directly. They're reaching out for your perspective or help. Be especially welcoming and helpful!
-"""
-    
-    prompt = f"""{ACCELERATE_PERSONA_PROMPT}
-{summon_note}
-**TARGET RESPONSE LENGTH:** Aim for {MIN_REPLY_WORDS}-{MAX_REPLY_WORDS} words. Be concise but substantive.
+    return "".join([
+        _SUMMON_PROMPT_PREFIX if is_summon else _REPLY_PROMPT_PREFIX,
+        context,
+        "\n\n---\nMESSAGE TO RESPOND TO:\n",
+        incoming_text,
+        "\n\n---\nYour response:",
+    ])
 
----
-CONTEXT (use this to understand what the conversation is about):
-{context}
-
----
-MESSAGE TO RESPOND TO:
-{incoming_text}
 
----
-Your response:"""
+def truncate_incoming_text(text: str, max_chars: int = MAX_INCOMING_CHARS) -> str:
+    """
+    Cap the message text sent to Gemini to bound input tokens.
     
-    return prompt
+    Long text keeps its opening 80% and closing 20% of the budget, since
+    the head usually carries the point and the tail the question.
+    """
+    if len(text) <= max_chars:
+        return text
+    head_chars = max_chars * 4 // 5
+    tail_chars = max_chars - head_chars
+    return f"{text[:head_chars]}\n[...]\n{text[-tail_chars:]}"
 
 
-def get_parent_chain_context(comment, max_parents: int = 5) -> tuple[list, str]:
+def get_parent_chain_context(comment, max_parents: int = 5) -> tuple[deque, str]:
     """
     Get parent comments for context building.
     
     Returns:
-        Tuple of (parent_comment_objects, formatted_context_string)
+        Tuple of (parent_comment_objects oldest first, formatted_context_string)
     """
-    parents = []
+    parents = deque()
     current = comment
     
     while len(parents) < max_parents:
@@ -104,23 +164,24 @@ def get_parent_chain_context(comment, max_parents: int = 5) -> tuple[list, str]:
             parent = current.parent()
             # Check if parent is a comment (not the submission)
             if hasattr(parent, 'body') and parent.body and parent.body != '[deleted]':
-                parents.append(parent)
+                parents.appendleft(parent)  # Walking upwards, so this keeps oldest first
                 current = parent
             else:
                 break
         except:
             break
     
-    parents = list(reversed(parents))  # Oldest first
-    
     # Build context string
-    context_parts = []
+    buf = io.StringIO()
     for i, parent in enumerate(parents, 1):
-        author = parent.author.name if hasattr(parent, 'author') and parent.author else "[deleted]"
+        if i > 1:
+            buf.write("\n\n")
+        author = getattr(parent, 'author', None)
+        author = author.name if author else "[deleted]"
         snippet = parent.body[:500] + "..." if len(parent.body) > 500 else parent.body
-        context_parts.append(f"[Comment {i} by u/{author}]: {snippet}")
+        buf.write(f"[Comment {i} by u/{author}]: {snippet}")
     
-    context_string = "\n\n".join(context_parts) if context_parts else "(No parent comments)"
+    context_string = buf.getvalue() or "(No parent comments)"
     
     return parents, context_string
 
@@ -129,20 +190,55 @@ def build_full_context(comment, submission) -> str:
     """
     Build full context string including post info and parent chain.
     """
-    context_parts = []
+    buf = io.StringIO()
     
     # Add submission context
-    context_parts.append(f"**Post Title:** {submission.title}")
+    buf.write("**Post Title:** ")
+    buf.write(submission.title)
     if submission.selftext:
         snippet = submission.selftext[:400] + "..." if len(submission.selftext) > 400 else submission.selftext
-        context_parts.append(f"**Post Body (snippet):** {snippet}")
+        buf.write("\n\n**Post Body (snippet):** ")
+        buf.write(snippet)
     
     # Add parent chain
-    _, parent_context = get_parent_chain_context(comment)
-    if parent_context != "(No parent comments)":
-        context_parts.append(f"**Parent Comments:**\n{parent_context}")
+    parents, parent_context = get_parent_chain_context(comment)
+    if parents:
+        buf.write("\n\n**Parent Comments:**\n")
+        buf.write(parent_context)
+    
+    return buf.getvalue()
+
+
+def build_conversational_prompt(incoming_comment, submission, is_summon: bool = False) -> str:
+    """
+    Build the prompt for replying to a comment.
     
-    return "\n\n".join(context_parts)
+    Fetches the parent chain from Reddit.
+    """
+    # Build context
+    context = build_full_context(incoming_comment, submission)
+    
+    # Get the text to respond to
+    incoming_text = truncate_incoming_text(incoming_comment.body)
+    
+    return get_reply_prompt(incoming_text, context, is_summon)
+
+
+def generate_response(prompt: str, gemini_model) -> tuple[str, TokenInfo]:
+    """
+    Send an already-built reply prompt to Gemini.
+    
+    Shared by comment replies and post summons.
+    
+    Returns:
+        Tuple of (response_text, TokenInfo)
+    """
+    response = gemini_model.generate_content(
+        [{"role": "user", "parts": [prompt]}],
+        generation_config=_REPLY_GENERATION_CONFIG
+    )
+    
+    return response.text.strip(), TokenInfo.from_response(response)
 
 
 def generate_conversational_response(
@@ -150,7 +246,7 @@ def generate_conversational_response(
     submission,
     gemini_model,
     is_summon: bool = False
-) -> tuple[str, dict]:
+) -> tuple[str, TokenInfo]:
     """
     Generate a conversational response using the Optimist Prime persona.
     
@@ -161,41 +257,16 @@ def generate_conversational_response(
         is_summon: Whether this is a summon (vs reply to bot's comment)
     
     Returns:
-        Tuple of (response_text, token_info_dict)
+        Tuple of (response_text, TokenInfo)
     """
-    # Build context
-    context = build_full_context(incoming_comment, submission)
-    
-    # Get the text to respond to
-    incoming_text = incoming_comment.body
-    
-    # Build prompt
-    prompt = get_reply_prompt(incoming_text, context, is_summon)
-    
-    # Generate response
-    response = gemini_model.generate_content(
-        [{"role": "user", "parts": [prompt]}],
-        generation_config={
-            "temperature": 0.7,  # Slightly higher for more natural conversation
-            "max_output_tokens": 512
-        }
-    )
-    
-    # Extract token info
-    token_info = {
-        "input_tokens": response.usage_metadata.prompt_token_count if hasattr(response, 'usage_metadata') else 0,
-        "output_tokens": response.usage_metadata.candidates_token_count if hasattr(response, 'usage_metadata') else 0,
-    }
-    token_info["total_tokens"] = token_info["input_tokens"] + token_info["output_tokens"]
-    token_info["cost"] = (token_info["input_tokens"] * 0.10 + token_info["output_tokens"] * 0.40) / 1_000_000
-    
-    return response.text.strip(), token_info
+    prompt = build_conversational_prompt(incoming_comment, submission, is_summon)
+    return generate_response(prompt, gemini_model)
 
 
 def generate_post_summon_response(
     submission,
     gemini_model
-) -> tuple[str, dict]:
+) -> tuple[str, TokenInfo]:
     """
     Generate a response when summoned in a post (not a comment).
     
@@ -204,7 +275,7 @@ def generate_post_summon_response(
         gemini_model: Initialized Gemini model
     
     Returns:
-        Tuple of (response_text, token_info_dict)
+        Tuple of (response_text, TokenInfo)
     """
     # Build context from the post
     context = f"**Post Title:** {submission.title}"
@@ -213,25 +284,9 @@ def generate_post_summon_response(
     
     # The "incoming text" is the post itself
     incoming_text = f"{submission.title}\n\n{submission.selftext}" if submission.selftext else submission.title
+    incoming_text = truncate_incoming_text(incoming_text)
     
     # Build prompt
     prompt = get_reply_prompt(incoming_text, context, is_summon=True)
     
-    # Generate response
-    response = gemini_model.generate_content(
-        [{"role": "user", "parts": [prompt]}],
-        generation_config={
-            "temperature": 0.7,
-            "max_output_tokens": 512
-        }
-    )
-    
-    # Extract token info
-    token_info = {
-        "input_tokens": response.usage_metadata.prompt_token_count if hasattr(response, 'usage_metadata') else 0,
-        "output_tokens": response.usage_metadata.candidates_token_count if hasattr(response, 'usage_metadata') else 0,
-    }
-    token_info["total_tokens"] = token_info["input_tokens"] + token_info["output_tokens"]
-    token_info["cost"] = (token_info["input_tokens"] * 0.10 + token_info["output_tokens"] * 0.40) / 1_000_000
-    
-    return response.text.strip(), token_info
+    return generate_response(prompt, gemini_model)
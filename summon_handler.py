@@ -3,115 +3,50 @@ Summon detection and response for the Optimist Prime bot.
 Handles responding when users explicitly summon the bot anywhere in r/accelerate.
 """
 
-import re
-from datetime import datetime
+import time
+from collections import deque
 
 from config import (
     SUBREDDIT,
     MAX_REPLIES_PER_RUN,
-    MAX_AGE_HOURS,
-    SUMMON_PATTERNS,
-    HOSTILE_PATTERNS,
-    BOT_INDICATORS,
-    SAME_USER_COOLDOWN_HOURS,
-    SAME_USER_REPLIES_BEFORE_COOLDOWN,
-    MOD_CACHE_REFRESH_DAYS,
+    SUMMON_OR_HOSTILE_RE,
+    SUMMON_LITERAL_HINTS,
 )
+from handler_common import (
+    is_likely_bot,
+    is_too_old,
+    check_user_cooldown,
+    prune_recent_user_replies,
+    mark_processed,
+)
+from moderator_cache import get_cached_moderators, is_moderator
 from persona import generate_conversational_response, generate_post_summon_response
 
+SUMMON_RESPONSES_LIMIT = 2000  # Number of handled comment/post IDs remembered across runs
 
-def get_cached_moderators(state: dict, subreddit) -> set:
-    """
-    Get moderator set from cache, refreshing from Reddit if stale.
-    Updates state in-place with cached data.
+
+def classify_summon(text: str) -> tuple[bool, bool]:
     """
-    now = datetime.utcnow().timestamp()
-    cache_max_age = MOD_CACHE_REFRESH_DAYS * 24 * 3600  # Convert days to seconds
-    
-    cached_mods = state.get("moderator_cache", {})
-    last_refresh = cached_mods.get("last_refresh", 0)
-    mod_list = cached_mods.get("moderators", [])
+    Scan text once for summon and hostile phrases.
     
-    # Check if cache is fresh enough
-    if mod_list and (now - last_refresh) < cache_max_age:
-        return set(m.lower() for m in mod_list)
-    
-    # Cache is stale or empty - refresh from Reddit
-    try:
-        fresh_mods = [mod.name for mod in subreddit.moderator()]
-        state["moderator_cache"] = {
-            "moderators": fresh_mods,
-            "last_refresh": now
-        }
-        print(f"    🔄 Refreshed moderator cache ({len(fresh_mods)} mods)")
-        return set(m.lower() for m in fresh_mods)
-    except Exception as e:
-        print(f"    ⚠️ Could not refresh mod cache: {e}")
-        # Return stale cache if available, otherwise empty
-        return set(m.lower() for m in mod_list)
-
-
-def is_moderator(author_name: str | None, state: dict, subreddit) -> bool:
-    """Check if a user is a moderator of the subreddit."""
-    if not author_name:
-        return False
-    mods = get_cached_moderators(state, subreddit)
-    return author_name.lower() in mods
-
-
-def is_summon(text: str) -> bool:
-    """Check if text contains a summon phrase for the bot."""
-    text_lower = text.lower()
-    for pattern in SUMMON_PATTERNS:
-        if re.search(pattern, text_lower, re.IGNORECASE):
-            return True
-    return False
-
-
-def is_hostile_comment(text: str) -> bool:
-    """Check if a comment appears hostile/bad-faith."""
+    Returns:
+        Tuple of (is_summon, is_hostile)
+    """
+    # Cheap substring pre-filter: most comments never mention the bot, and the
+    # hostile flag only matters for summons
     text_lower = text.lower()
-    for pattern in HOSTILE_PATTERNS:
-        if re.search(pattern, text_lower):
-            return True
-    return False
-
-
-def is_likely_bot(author_name: str | None) -> bool:
-    """Check if an author is likely a bot based on username patterns."""
-    if not author_name:
-        return True
+    if not any(hint in text_lower for hint in SUMMON_LITERAL_HINTS):
+        return False, False
     
-    name_lower = author_name.lower()
-    for pattern in BOT_INDICATORS:
-        if re.search(pattern.lower(), name_lower):
-            return True
-    return False
-
-
-def is_too_old(created_utc: float) -> bool:
-    """Check if a comment/post is older than MAX_AGE_HOURS."""
-    age_seconds = datetime.utcnow().timestamp() - created_utc
-    age_hours = age_seconds / 3600
-    return age_hours > MAX_AGE_HOURS
-
-
-def check_user_cooldown(author_name: str | None, recent_replies: dict) -> bool:
-    """Check if we've recently replied to this user too many times."""
-    if not author_name or author_name not in recent_replies:
-        return False
-    
-    user_data = recent_replies[author_name]
-    reply_count = user_data.get("count", 0)
-    first_reply_time = user_data.get("first_reply_time", 0)
-    
-    # If under the limit, allow reply
-    if reply_count < SAME_USER_REPLIES_BEFORE_COOLDOWN:
-        return False
-    
-    # Over limit - check if cooldown has expired
-    hours_since = (datetime.utcnow().timestamp() - first_reply_time) / 3600
-    return hours_since < SAME_USER_COOLDOWN_HOURS
+    summoned = hostile = False
+    for match in SUMMON_OR_HOSTILE_RE.finditer(text):
+        if match.group("hostile") is not None:
+            hostile = True
+        else:
+            summoned = True
+        if summoned and hostile:
+            break
+    return summoned, hostile
 
 
 def check_for_summons(
@@ -139,67 +74,74 @@ def check_for_summons(
     total_cost = 0.0
     
     # Get tracking sets from state
-    summon_responses = set(state.get("summon_responses", []))
-    recent_user_replies = state.get("recent_user_replies", {})
+    summon_order = deque(state.get("summon_responses", []), maxlen=SUMMON_RESPONSES_LIMIT)
+    summon_responses = set(summon_order)
+    now = time.time()
+    
+    recent_user_replies = prune_recent_user_replies(state.get("recent_user_replies", {}), now)
     
     print(f"  🔔 Scanning for bot summons in r/{SUBREDDIT}...")
     
+    mods = get_cached_moderators(state, subreddit)  # Once per run; cooldown checks reuse it
+    
     # Check comments
     try:
-        comments = list(subreddit.comments(limit=100))
-        
-        for comment in comments:
+        # PRAW fetches the whole 100-item page in one request; each item below gets its own
+        # try so one malformed comment is skipped instead of aborting the scan
+        for comment in subreddit.comments(limit=100):
             # Check limits
             if summons_handled >= MAX_REPLIES_PER_RUN:
                 print(f"  ⏸️ Reached max summon responses per run ({MAX_REPLIES_PER_RUN})")
                 break
             
-            # Skip already processed
-            if comment.id in summon_responses:
-                continue
-            
-            # Skip too old
-            if is_too_old(comment.created_utc):
-                continue
-            
-            # Skip if it's our own comment
-            if comment.author and comment.author.name == bot_username:
-                continue
-            
-            # Skip deleted
-            if not comment.body or comment.body == '[deleted]':
-                continue
-            
-            # Check if this is a summon
-            if not is_summon(comment.body):
-                continue
-            
-            author_name = comment.author.name if comment.author else None
-            
-            # Skip bots
-            if is_likely_bot(author_name):
-                summon_responses.add(comment.id)
-                continue
-            
-            # Skip hostile
-            if is_hostile_comment(comment.body):
-                print(f"    ⏭️ Skipping hostile summon from u/{author_name}")
-                summon_responses.add(comment.id)
-                continue
-            
-            # Check user cooldown (moderators bypass this)
-            if not is_moderator(author_name, state, subreddit) and check_user_cooldown(author_name, recent_user_replies):
-                print(f"    ⏭️ Skipping u/{author_name} (cooldown active)")
-                continue
-            
-            print(f"    🔔 Summon detected from u/{author_name}: {comment.body[:60]}...")
-            
-            if dry_run:
-                print(f"       [DRY RUN] Would respond to summon in comment {comment.id}")
-                summon_responses.add(comment.id)
-                continue
-            
             try:
+                # Skip already processed
+                if comment.id in summon_responses:
+                    continue
+                
+                # Skip too old
+                if is_too_old(comment.created_utc, now):
+                    continue
+                
+                author = comment.author
+                author_name = author.name if author is not None else None
+                
+                # Skip if it's our own comment
+                if author_name == bot_username:
+                    continue
+                
+                # Skip deleted
+                body = comment.body
+                if not body or body == '[deleted]':
+                    continue
+                
+                # Skip bots (before any body regex work)
+                if is_likely_bot(author_name):
+                    continue
+                
+                # Check if this is a summon (and whether it's hostile, in the same pass)
+                summoned, hostile = classify_summon(body)
+                if not summoned:
+                    continue
+                
+                # Skip hostile
+                if hostile:
+                    print(f"    ⏭️ Skipping hostile summon from u/{author_name}")
+                    mark_processed(comment.id, summon_order, summon_responses)
+                    continue
+                
+                # Check user cooldown (moderators bypass this)
+                if not is_moderator(author_name, mods) and check_user_cooldown(author_name, recent_user_replies, now):
+                    print(f"    ⏭️ Skipping u/{author_name} (cooldown active)")
+                    continue
+                
+                print(f"    🔔 Summon detected from u/{author_name}: {body[:60]}...")
+                
+                if dry_run:
+                    print(f"       [DRY RUN] Would respond to summon in comment {comment.id}")
+                    mark_processed(comment.id, summon_order, summon_responses)
+                    continue
+                
                 # Get submission for context
                 submission = comment.submission
                 
@@ -214,22 +156,20 @@ def check_for_summons(
                 # Post the reply
                 comment.reply(response_text)
                 
-                print(f"       ✅ Responded to summon ({len(response_text.split())} words, {token_info['total_tokens']} tokens)")
+                print(f"       ✅ Responded to summon ({len(response_text.split())} words, {token_info.total_tokens} tokens)")
                 
                 # Update tracking
-                summon_responses.add(comment.id)
+                mark_processed(comment.id, summon_order, summon_responses)
                 # Track reply count per user
-                if author_name not in recent_user_replies:
-                    recent_user_replies[author_name] = {"count": 1, "first_reply_time": datetime.utcnow().timestamp()}
-                else:
-                    recent_user_replies[author_name]["count"] = recent_user_replies[author_name].get("count", 0) + 1
+                entry = recent_user_replies.setdefault(author_name, {"count": 0, "first_reply_time": now})
+                entry["count"] = entry.get("count", 0) + 1
                 summons_handled += 1
-                total_tokens += token_info["total_tokens"]
-                total_cost += token_info["cost"]
+                total_tokens += token_info.total_tokens
+                total_cost += token_info.cost
                 
             except Exception as e:
-                print(f"       ❌ Error responding to summon: {e}")
-                summon_responses.add(comment.id)
+                print(f"       ❌ Error handling summon candidate {comment.id}: {e}")
+                mark_processed(comment.id, summon_order, summon_responses)
     
     except Exception as e:
         print(f"  ❌ Error scanning comments for summons: {e}")
@@ -237,57 +177,57 @@ def check_for_summons(
     # Check posts for summons (in title or body)
     if summons_handled < MAX_REPLIES_PER_RUN:
         try:
-            posts = list(subreddit.new(limit=25))
-            
-            for post in posts:
+            # Same as the comment scan: one request for the page, per-item error isolation below
+            for post in subreddit.new(limit=25):
                 if summons_handled >= MAX_REPLIES_PER_RUN:
                     break
                 
                 post_id = f"post_{post.id}"
                 
-                # Skip already processed
-                if post_id in summon_responses:
-                    continue
-                
-                # Skip too old
-                if is_too_old(post.created_utc):
-                    continue
-                
-                # Skip if it's our own post (unlikely but possible)
-                if post.author and post.author.name == bot_username:
-                    continue
-                
-                # Check for summon in title or body
-                combined_text = f"{post.title} {post.selftext or ''}"
-                if not is_summon(combined_text):
-                    continue
-                
-                author_name = post.author.name if post.author else None
-                
-                # Skip bots
-                if is_likely_bot(author_name):
-                    summon_responses.add(post_id)
-                    continue
-                
-                # Skip hostile
-                if is_hostile_comment(combined_text):
-                    print(f"    ⏭️ Skipping hostile post summon from u/{author_name}")
-                    summon_responses.add(post_id)
-                    continue
-                
-                # Check user cooldown (moderators bypass this)
-                if not is_moderator(author_name, state, subreddit) and check_user_cooldown(author_name, recent_user_replies):
-                    print(f"    ⏭️ Skipping u/{author_name} (cooldown active)")
-                    continue
-                
-                print(f"    🔔 Summon in post by u/{author_name}: {post.title[:50]}...")
-                
-                if dry_run:
-                    print(f"       [DRY RUN] Would respond to summon in post {post.id}")
-                    summon_responses.add(post_id)
-                    continue
-                
                 try:
+                    # Skip already processed
+                    if post_id in summon_responses:
+                        continue
+                    
+                    # Skip too old
+                    if is_too_old(post.created_utc, now):
+                        continue
+                    
+                    author = post.author
+                    author_name = author.name if author is not None else None
+                    
+                    # Skip if it's our own post (unlikely but possible)
+                    if author_name == bot_username:
+                        continue
+                    
+                    # Skip bots (before any body regex work)
+                    if is_likely_bot(author_name):
+                        continue
+                    
+                    # Check for summon in title or body
+                    combined_text = f"{post.title} {post.selftext or ''}"
+                    summoned, hostile = classify_summon(combined_text)
+                    if not summoned:
+                        continue
+                    
+                    # Skip hostile
+                    if hostile:
+                        print(f"    ⏭️ Skipping hostile post summon from u/{author_name}")
+                        mark_processed(post_id, summon_order, summon_responses)
+                        continue
+                    
+                    # Check user cooldown (moderators bypass this)
+                    if not is_moderator(author_name, mods) and check_user_cooldown(author_name, recent_user_replies, now):
+                        print(f"    ⏭️ Skipping u/{author_name} (cooldown active)")
+                        continue
+                    
+                    print(f"    🔔 Summon in post by u/{author_name}: {post.title[:50]}...")
+                    
+                    if dry_run:
+                        print(f"       [DRY RUN] Would respond to summon in post {post.id}")
+                        mark_processed(post_id, summon_order, summon_responses)
+                        continue
+                    
                     # Generate response for post
                     response_text, token_info = generate_post_summon_response(
                         post,
@@ -297,28 +237,26 @@ def check_for_summons(
                     # Post the reply
                     post.reply(response_text)
                     
-                    print(f"       ✅ Responded to post summon ({len(response_text.split())} words, {token_info['total_tokens']} tokens)")
+                    print(f"       ✅ Responded to post summon ({len(response_text.split())} words, {token_info.total_tokens} tokens)")
                     
                     # Update tracking
-                    summon_responses.add(post_id)
+                    mark_processed(post_id, summon_order, summon_responses)
                     # Track reply count per user
-                    if author_name not in recent_user_replies:
-                        recent_user_replies[author_name] = {"count": 1, "first_reply_time": datetime.utcnow().timestamp()}
-                    else:
-                        recent_user_replies[author_name]["count"] = recent_user_replies[author_name].get("count", 0) + 1
+                    entry = recent_user_replies.setdefault(author_name, {"count": 0, "first_reply_time": now})
+                    entry["count"] = entry.get("count", 0) + 1
                     summons_handled += 1
-                    total_tokens += token_info["total_tokens"]
-                    total_cost += token_info["cost"]
+                    total_tokens += token_info.total_tokens
+                    total_cost += token_info.cost
                     
                 except Exception as e:
-                    print(f"       ❌ Error responding to post summon: {e}")
-                    summon_responses.add(post_id)
+                    print(f"       ❌ Error handling post summon candidate {post.id}: {e}")
+                    mark_processed(post_id, summon_order, summon_responses)
         
         except Exception as e:
             print(f"  ❌ Error scanning posts for summons: {e}")
     
     # Update state
-    state["summon_responses"] = list(summon_responses)[-2000:]  # Keep last 2000
+    state["summon_responses"] = list(summon_order)  # Oldest first, capped at SUMMON_RESPONSES_LIMIT
     state["recent_user_replies"] = recent_user_replies
     state["daily_replies"] = state.get("daily_replies", 0) + summons_handled
     
@@ -5,21 +5,30 @@ Also handles reply monitoring and summon detection.
 """
 
 import os
+import re
 import sys
 import json
+import time
 import argparse
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
 from datetime import datetime, date
 
 import praw
 import google.generativeai as genai
 
+try:
+    import orjson
+except ImportError:  # Optional speedup; fall back to the stdlib json module
+    orjson = None
+
 # Import configuration from centralized config
 from config import (
     SUBREDDIT,
     WORD_THRESHOLD,
     MAX_TLDR_PER_RUN,
     MAX_TLDR_PER_DAY,
-    MAX_AGE_HOURS,
     COMMENT_MILESTONES,
     MAX_REPLIES_PER_DAY,
 )
@@ -27,15 +36,69 @@ from config import (
 # Import handlers for reply and summon features
 from reply_handler import check_inbox_replies
 from summon_handler import check_for_summons
+from persona import TokenInfo
+from handler_common import is_too_old, mark_processed
+
+PROCESSED_POSTS_LIMIT = 1000  # Number of TLDRed post IDs remembered across runs
+PROCESSED_COMMENTS_LIMIT = 2000  # Number of TLDRed comment IDs remembered across runs
+
+# Word counting only needs markdown out of the way, not rendered: link targets are
+# dropped in one regex pass and the remaining markers are deleted by translate().
+# Unpaired markers are deleted too, so a lone "*" bullet or stray "[" is no longer
+# counted as a word; counts can come out slightly lower than a span-matching strip.
+_MD_LINK_TARGET_RE = re.compile(r'\]\([^)]+\)')
+_MD_MARKERS_TABLE = str.maketrans('', '', '*`[]')
+
+# N words need at least N characters plus N-1 separators, and markdown stripping only
+# removes characters, so anything shorter than this can't reach WORD_THRESHOLD
+_MIN_CHARS_FOR_THRESHOLD = 2 * WORD_THRESHOLD - 1
+
+# Start of an existing comment summary section in the bot's TLDR comment
+_SUMMARY_SECTION_RE = re.compile(r'\n*---\s*\n+\*\*💬 (Community )?Discussion')
+
+
+def _read_json(path: str):
+    """Parse a JSON file with orjson when available."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write_json_atomic(path: str, data: dict):
+    """Write JSON to a temp file, then rename it into place so a crash can't leave a torn file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_file = path + ".tmp"
+    try:
+        if orjson is not None:
+            # Serialize before touching disk; OPT_NON_STR_KEYS stringifies keys the way json.dump does
+            payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+            with open(tmp_file, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())  # Data must be on disk before the rename makes it visible
+        else:
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_file, path)
+    except BaseException:
+        # The previous file is untouched; just don't leave a partial temp file next to it
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
 
 
 def load_state(state_file: str = "data/tldr_state.json") -> dict:
     """Load TLDR state from file."""
     if os.path.exists(state_file):
         try:
-            with open(state_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
+            return _read_json(state_file)
+        except (ValueError, OSError):  # JSON decode errors (json and orjson) subclass ValueError
             pass
     
     return {
@@ -62,10 +125,8 @@ def load_state(state_file: str = "data/tldr_state.json") -> dict:
 
 
 def save_state(state: dict, state_file: str = "data/tldr_state.json"):
-    """Save state to file."""
-    os.makedirs(os.path.dirname(state_file), exist_ok=True)
-    with open(state_file, 'w') as f:
-        json.dump(state, f, indent=2)
+    """Save state to file (written to a temp file, then renamed into place)."""
+    _write_json_atomic(state_file, state)
 
 
 def update_stats(stats_file: str = "data/stats.json", tldrs_generated: int = 0, tokens: int = 0, cost: float = 0.0):
@@ -74,9 +135,8 @@ def update_stats(stats_file: str = "data/stats.json", tldrs_generated: int = 0,
     
     if os.path.exists(stats_file):
         try:
-            with open(stats_file, 'r') as f:
-                stats = json.load(f)
-        except:
+            stats = _read_json(stats_file)
+        except (ValueError, OSError):
             pass
     
     stats["total_tldrs"] = stats.get("total_tldrs", 0) + tldrs_generated
@@ -85,32 +145,31 @@ def update_stats(stats_file: str = "data/stats.json", tldrs_generated: int = 0,
     stats["runs"] = stats.get("runs", 0) + 1
     stats["last_run"] = datetime.utcnow().isoformat()
     
-    os.makedirs(os.path.dirname(stats_file), exist_ok=True)
-    with open(stats_file, 'w') as f:
-        json.dump(stats, f, indent=2)
+    _write_json_atomic(stats_file, stats)
 
 
 def count_words(text: str) -> int:
     """Count words in text, handling markdown."""
-    import re
     if not text:
         return 0
-    # Remove markdown
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Bold
-    text = re.sub(r'\*([^*]+)\*', r'\1', text)      # Italic
-    text = re.sub(r'`([^`]+)`', r'\1', text)        # Code
-    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)  # Links
+    # Plain text (the common case for comments) has nothing to strip
+    if '*' not in text and '`' not in text and '[' not in text and ']' not in text:
+        return len(text.split())
+    # Remove markdown (bold/italic/code markers, link URLs)
+    text = _MD_LINK_TARGET_RE.sub('', text).translate(_MD_MARKERS_TABLE)
+    # str.split() is C-level and beats re.findall/finditer(r'\S+') counting by ~3-4x here
     return len(text.split())
 
 
 def calculate_max_tldr_words(content_word_count: int) -> int:
     """Calculate target TLDR length (17% of content, clamped 40-400)."""
-    scaled = int(content_word_count * 0.17)
+    scaled = (content_word_count * 17) // 100  # Integer math; same result as int(count * 0.17)
     return max(40, min(400, scaled))
 
 
+@lru_cache(maxsize=64)
 def get_tldr_prompt(max_words: int = 75) -> str:
-    """Get the TLDR generation prompt for r/accelerate posts."""
+    """Get the TLDR generation prompt for r/accelerate posts (memoized per max_words)."""
     return f"""You are a summarization assistant for r/accelerate, a community focused on technological acceleration, the Technological Singularity, and AI progress.
 
 Your task is to create a concise, accurate TLDR (Too Long; Didn't Read) summary.
@@ -134,8 +193,9 @@ Your task is to create a concise, accurate TLDR (Too Long; Didn't Read) summary.
 Provide only the summary content - no headers, labels, or metadata. Just the summary text, ready to post directly. Your summary MUST end with a complete sentence and proper punctuation."""
 
 
+@lru_cache(maxsize=64)
 def get_comment_summary_prompt(max_words: int = 100) -> str:
-    """Get the comment summarization prompt."""
+    """Get the comment summarization prompt (memoized per max_words)."""
     return f"""You are summarizing community discussion from r/accelerate, a subreddit about technological acceleration and AI progress.
 
 Your task is to synthesize the main viewpoints, key insights, and any notable debates from the comments.
@@ -151,30 +211,20 @@ Provide only the summary content - no headers, labels, or metadata. Just the sum
 Your summary MUST end with a complete sentence and proper punctuation."""
 
 
-def generate_tldr(content: str, title: str, gemini_model) -> tuple[str, dict]:
-    """Generate TLDR using Gemini API."""
-    word_count = count_words(content)
+def generate_tldr(content: str, title: str, gemini_model, word_count: int | None = None) -> tuple[str, TokenInfo]:
+    """Generate TLDR using Gemini API. Pass word_count if the caller already counted content."""
+    if word_count is None:
+        word_count = count_words(content)
     max_words = calculate_max_tldr_words(word_count)
     
     prompt = get_tldr_prompt(max_words)
-    full_content = f"Title: {title}\n\nContent: {content}"
-    
+    # Separate parts, so the (possibly long) selftext isn't copied into one big prompt string
     response = gemini_model.generate_content(
-        [{"role": "user", "parts": [prompt + "\n\n" + full_content]}],
+        [{"role": "user", "parts": [prompt, f"\n\nTitle: {title}\n\nContent: ", content]}],
         generation_config={"temperature": 0.3, "max_output_tokens": 1024}
     )
     
-    # Extract token counts
-    token_info = {
-        "input_tokens": response.usage_metadata.prompt_token_count if hasattr(response, 'usage_metadata') else 0,
-        "output_tokens": response.usage_metadata.candidates_token_count if hasattr(response, 'usage_metadata') else 0,
-    }
-    token_info["total_tokens"] = token_info["input_tokens"] + token_info["output_tokens"]
-    
-    # Estimate cost (Gemini 2.0 Flash pricing)
-    token_info["cost"] = (token_info["input_tokens"] * 0.10 + token_info["output_tokens"] * 0.40) / 1_000_000
-    
-    return response.text.strip(), token_info
+    return response.text.strip(), TokenInfo.from_response(response)
 
 
 def get_parent_chain(comment, max_parents: int = 6) -> list:
@@ -195,9 +245,10 @@ def get_parent_chain(comment, max_parents: int = 6) -> list:
     return list(reversed(parents))  # Oldest first
 
 
-def generate_comment_tldr(comment, submission, gemini_model) -> tuple[str, dict]:
+def generate_comment_tldr(comment, submission, gemini_model, word_count: int | None = None) -> tuple[str, TokenInfo]:
     """Generate TLDR for a comment with context from parents and submission."""
-    word_count = count_words(comment.body)
+    if word_count is None:
+        word_count = count_words(comment.body)
     max_words = calculate_max_tldr_words(word_count)
     
     # Build context
@@ -238,82 +289,78 @@ CONTEXT:
 
 ---
 TARGET COMMENT TO SUMMARIZE:
-{comment.body}"""
+"""
 
     response = gemini_model.generate_content(
-        [{"role": "user", "parts": [prompt]}],
+        [{"role": "user", "parts": [prompt, comment.body]}],
         generation_config={"temperature": 0.3, "max_output_tokens": 1024}
     )
     
-    token_info = {
-        "input_tokens": response.usage_metadata.prompt_token_count if hasattr(response, 'usage_metadata') else 0,
-        "output_tokens": response.usage_metadata.candidates_token_count if hasattr(response, 'usage_metadata') else 0,
-    }
-    token_info["total_tokens"] = token_info["input_tokens"] + token_info["output_tokens"]
-    token_info["cost"] = (token_info["input_tokens"] * 0.10 + token_info["output_tokens"] * 0.40) / 1_000_000
-    
-    return response.text.strip(), token_info
+    return response.text.strip(), TokenInfo.from_response(response)
 
 
-def generate_comment_summary(comments: list, gemini_model) -> tuple[str, dict]:
+def generate_comment_summary(comments: list, gemini_model) -> tuple[str, TokenInfo]:
     """Generate summary of comments using Gemini API."""
     # Build comment text
     comment_texts = []
     for i, comment in enumerate(comments[:30], 1):  # Limit to 30 comments for token efficiency
         if hasattr(comment, 'body') and comment.body and comment.body != '[deleted]':
-            comment_texts.append(f"Comment {i}: {comment.body[:500]}")  # Truncate long comments
+            comment_texts.append(f"Comment {i}: {comment.body[:500]}\n\n")  # Truncate long comments
     
     if not comment_texts:
-        return None, {"total_tokens": 0, "cost": 0.0}
+        return None, TokenInfo(input_tokens=0, output_tokens=0, total_tokens=0, cost=0.0)
     
-    combined_content = "\n\n".join(comment_texts)
-    word_count = count_words(combined_content)
+    # Counted per comment, so a link cut off by the truncation can't swallow the next comment
+    word_count = sum(count_words(text) for text in comment_texts)
     max_words = calculate_max_tldr_words(word_count)
     
     prompt = get_comment_summary_prompt(max_words)
     
+    # One part per comment instead of joining them all into the prompt string
     response = gemini_model.generate_content(
-        [{"role": "user", "parts": [prompt + "\n\nComments to summarize:\n\n" + combined_content]}],
+        [{"role": "user", "parts": [prompt + "\n\nComments to summarize:\n\n", *comment_texts]}],
         generation_config={"temperature": 0.3, "max_output_tokens": 1024}
     )
     
-    token_info = {
-        "input_tokens": response.usage_metadata.prompt_token_count if hasattr(response, 'usage_metadata') else 0,
-        "output_tokens": response.usage_metadata.candidates_token_count if hasattr(response, 'usage_metadata') else 0,
-    }
-    token_info["total_tokens"] = token_info["input_tokens"] + token_info["output_tokens"]
-    token_info["cost"] = (token_info["input_tokens"] * 0.10 + token_info["output_tokens"] * 0.40) / 1_000_000
-    
-    return response.text.strip(), token_info
+    return response.text.strip(), TokenInfo.from_response(response)
+
+
+def fetch_comment_list(submission) -> list:
+    """Load a submission's comment tree (MoreComments dropped) and flatten it."""
+    submission.comments.replace_more(limit=0)
+    return submission.comments.list()
+
 
+def is_authored_by(item, username: str, user_fullname: str | None = None) -> bool:
+    """Check who wrote a comment without building its Redditor (reads the listing payload only)."""
+    fields = vars(item)  # Plain attribute access on a missing field would trigger a lazy fetch
+    author_fullname = fields.get("author_fullname")
+    if user_fullname and author_fullname:
+        return author_fullname == user_fullname
+    author = fields.get("author")
+    return author is not None and author.name == username
 
-def find_bot_comment(submission, username: str):
+
+def find_bot_comment(submission, username: str, user_fullname: str | None = None):
     """Find our existing stickied comment on a post, if any."""
     submission.comments.replace_more(limit=0)
     for comment in submission.comments:
-        if hasattr(comment, 'author') and comment.author:
-            if comment.author.name == username and comment.stickied:
-                return comment
+        # A post has at most one stickied comment, so the first one settles it
+        if comment.stickied:
+            return comment if is_authored_by(comment, username, user_fullname) else None
     return None
 
 
 def get_next_milestone(comment_count: int, last_milestone: int = 0) -> int:
     """Get the next milestone threshold that should be processed."""
-    for milestone in COMMENT_MILESTONES:
-        if comment_count >= milestone and milestone > last_milestone:
-            # Find the highest milestone we've crossed
-            pass
-    
-    # Find highest milestone we've crossed
-    current_milestone = 0
-    for milestone in COMMENT_MILESTONES:
-        if comment_count >= milestone:
-            current_milestone = milestone
+    # Find highest milestone we've crossed (COMMENT_MILESTONES is sorted ascending)
+    idx = bisect_right(COMMENT_MILESTONES, comment_count) - 1
+    if idx < 0:
+        return 0
     
     # Return it only if it's higher than what we've processed
-    if current_milestone > last_milestone:
-        return current_milestone
-    return 0
+    current_milestone = COMMENT_MILESTONES[idx]
+    return current_milestone if current_milestone > last_milestone else 0
 
 
 def check_daily_limit(state: dict) -> tuple[bool, dict]:
@@ -353,13 +400,6 @@ def check_daily_reply_limit(state: dict) -> tuple[bool, dict]:
     return True, state
 
 
-def is_too_old(created_utc: float) -> bool:
-    """Check if a post/comment is older than MAX_AGE_HOURS."""
-    age_seconds = datetime.utcnow().timestamp() - created_utc
-    age_hours = age_seconds / 3600
-    return age_hours > MAX_AGE_HOURS
-
-
 def main():
     parser = argparse.ArgumentParser(description="Reddit TLDR Bot for GitHub Actions")
     parser.add_argument("--dry-run", action="store_true", help="Don't post TLDRs, just log what would happen")
@@ -382,7 +422,9 @@ def main():
         password=os.environ["REDDIT_PASSWORD"],
         user_agent="Reddit TLDR Bot v1.0 (GitHub Actions)"
     )
-    bot_username = reddit.user.me().name
+    me = reddit.user.me()
+    bot_username = me.name
+    bot_fullname = me.fullname  # t2_ id, compared against comments' author_fullname
     print(f"✅ Connected to Reddit as u/{bot_username}")
     
     # Initialize Gemini
@@ -393,8 +435,10 @@ def main():
     # Load state
     state = load_state()
     last_check = state.get("last_check")
-    processed_posts = set(state.get("processed_posts", []))
-    processed_comments = set(state.get("processed_comments", []))
+    processed_post_order = deque(state.get("processed_posts", []), maxlen=PROCESSED_POSTS_LIMIT)
+    processed_posts = set(processed_post_order)
+    processed_comment_order = deque(state.get("processed_comments", []), maxlen=PROCESSED_COMMENTS_LIMIT)
+    processed_comments = set(processed_comment_order)
     comment_summaries = state.get("comment_summaries", {})
     
     # Check daily limit
@@ -408,18 +452,21 @@ def main():
     total_tokens = 0
     total_cost = 0.0
     
+    now = time.time()  # Once per run; every age check compares against it
+    
     limit = 10 if last_check is None else 50
     print(f"🔍 Checking last {limit} posts on r/{SUBREDDIT}...")
     
     posts_to_check = list(subreddit.new(limit=limit))
     
+    # Skip posts older than MAX_AGE_HOURS (once, for every phase)
+    fresh_posts = [s for s in posts_to_check if not is_too_old(s.created_utc, now)]
+    # Phases 2 and 3 act on at most one post per run, so look at the busiest threads first
+    busiest_posts = sorted(fresh_posts, key=lambda s: s.num_comments, reverse=True)
+    
     # Phase 1: Generate TLDRs for long posts
     if can_proceed:
-        for submission in posts_to_check:
-            # Skip if too old (older than MAX_AGE_HOURS)
-            if is_too_old(submission.created_utc):
-                continue
-            
+        for submission in fresh_posts:
             # Skip if already processed
             if submission.id in processed_posts:
                 continue
@@ -428,7 +475,10 @@ def main():
             if not submission.selftext:
                 continue
             
-            # Check word count
+            # Check word count (length check first so short posts skip the count)
+            if len(submission.selftext) < _MIN_CHARS_FOR_THRESHOLD:
+                print(f"  📝 Post {submission.id}: {len(submission.selftext)} chars (too short for {WORD_THRESHOLD} words)")
+                continue
             word_count = count_words(submission.selftext)
             if word_count < WORD_THRESHOLD:
                 print(f"  📝 Post {submission.id}: {word_count} words (below {WORD_THRESHOLD} threshold)")
@@ -438,25 +488,25 @@ def main():
             
             if args.dry_run:
                 print(f"     [DRY RUN] Would generate TLDR for: {submission.title[:50]}...")
-                processed_posts.add(submission.id)
+                mark_processed(submission.id, processed_post_order, processed_posts)
                 continue
             
             try:
                 # Generate TLDR
-                tldr_text, token_info = generate_tldr(submission.selftext, submission.title, model)
+                tldr_text, token_info = generate_tldr(submission.selftext, submission.title, model, word_count)
                 
                 # Post comment
                 comment_text = f"**Post TLDR:** {tldr_text}"
                 comment = submission.reply(comment_text)
                 comment.mod.distinguish(sticky=True)
                 
-                print(f"     ✅ Posted TLDR ({len(tldr_text.split())} words, {token_info['total_tokens']} tokens)")
+                print(f"     ✅ Posted TLDR ({len(tldr_text.split())} words, {token_info.total_tokens} tokens)")
                 
-                processed_posts.add(submission.id)
+                mark_processed(submission.id, processed_post_order, processed_posts)
                 tldrs_generated += 1
                 state["daily_tldrs"] = state.get("daily_tldrs", 0) + 1
-                total_tokens += token_info["total_tokens"]
-                total_cost += token_info["cost"]
+                total_tokens += token_info.total_tokens
+                total_cost += token_info.cost
                 
                 # Only 1 TLDR per run
                 if tldrs_generated >= MAX_TLDR_PER_RUN:
@@ -472,11 +522,7 @@ def main():
     if can_proceed:
         print(f"\n💬 Checking posts for comment summaries...")
         
-        for submission in posts_to_check:
-            # Skip if too old (older than MAX_AGE_HOURS)
-            if is_too_old(submission.created_utc):
-                continue
-            
+        for submission in busiest_posts:
             comment_count = submission.num_comments
             post_id = submission.id
             last_milestone = comment_summaries.get(post_id, 0)
@@ -510,7 +556,7 @@ def main():
                     continue
                 
                 # Find existing bot comment or create new one
-                existing_comment = find_bot_comment(submission, bot_username)
+                existing_comment = find_bot_comment(submission, bot_username, bot_fullname)
                 
                 if existing_comment:
                     # Edit existing TLDR to replace comment summary
@@ -518,24 +564,22 @@ def main():
                     
                     # Remove old comment summary if present (handle various line endings)
                     # Check for both "Community Discussion" and "Community Discussion Summary" formats
-                    import re
-                    # Pattern to match any existing comment summary section
-                    new_body = re.split(r'\n*---\s*\n+\*\*💬 (Community )?Discussion', new_body)[0].rstrip()
+                    new_body = _SUMMARY_SECTION_RE.split(new_body, maxsplit=1)[0].rstrip()
                     
                     new_body += f"\n\n---\n\n**💬 Discussion Summary ({next_milestone}+ comments):** {summary_text}"
                     existing_comment.edit(new_body)
-                    print(f"     ✅ Updated existing comment with summary ({token_info['total_tokens']} tokens)")
+                    print(f"     ✅ Updated existing comment with summary ({token_info.total_tokens} tokens)")
                 else:
                     # Create new pinned comment
                     comment_text = f"**💬 Discussion Summary ({next_milestone}+ comments):** {summary_text}"
                     comment = submission.reply(comment_text)
                     comment.mod.distinguish(sticky=True)
-                    print(f"     ✅ Created new summary comment ({token_info['total_tokens']} tokens)")
+                    print(f"     ✅ Created new summary comment ({token_info.total_tokens} tokens)")
                 
                 comment_summaries[post_id] = next_milestone
                 state["daily_tldrs"] = state.get("daily_tldrs", 0) + 1
-                total_tokens += token_info["total_tokens"]
-                total_cost += token_info["cost"]
+                total_tokens += token_info.total_tokens
+                total_cost += token_info.cost
                 
                 # Only process one comment summary per run as well
                 break
@@ -546,36 +590,35 @@ def main():
     # Phase 3: Generate TLDRs for long individual comments
     can_proceed, state = check_daily_limit(state)
     
-    if can_proceed:
+    if can_proceed and tldrs_generated < MAX_TLDR_PER_RUN:
         print(f"\n📝 Checking for long comments to TLDR...")
         
-        for submission in posts_to_check:
-            # Skip if too old (older than MAX_AGE_HOURS)
-            if is_too_old(submission.created_utc):
-                continue
-            
+        for submission in busiest_posts:
             # Already hit limit for this run?
             if tldrs_generated >= MAX_TLDR_PER_RUN:
                 break
             
-            # Fetch comments
-            submission.comments.replace_more(limit=0)
+            # Trees are fetched one post at a time on this thread (PRAW is not thread-safe),
+            # so posts after the one that uses the budget are never fetched at all
+            try:
+                comments = fetch_comment_list(submission)
+            except Exception as e:
+                print(f"  ❌ Could not load comments for {submission.id}: {e}")
+                continue
             
-            for comment in submission.comments.list():
-                # Skip if already processed
-                if comment.id in processed_comments:
-                    continue
-                
-                # Skip if comment is too old
-                if is_too_old(comment.created_utc):
-                    continue
-                
-                # Skip deleted/removed comments
-                if not hasattr(comment, 'body') or not comment.body or comment.body == '[deleted]':
-                    continue
-                
+            # Cheap checks in one pass, length first: most comments are far too short to
+            # reach WORD_THRESHOLD, so few survive to the per-comment checks below
+            candidates = [
+                comment for comment in comments
+                if len(getattr(comment, 'body', None) or '') >= _MIN_CHARS_FOR_THRESHOLD
+                and comment.body != '[deleted]'
+                and comment.id not in processed_comments
+                and not is_too_old(comment.created_utc, now)
+            ]
+            
+            for comment in candidates:
                 # Skip bot's own comments
-                if hasattr(comment, 'author') and comment.author and comment.author.name == bot_username:
+                if is_authored_by(comment, bot_username, bot_fullname):
                     continue
                 
                 # Check word count
@@ -587,24 +630,24 @@ def main():
                 
                 if args.dry_run:
                     print(f"     [DRY RUN] Would generate Comment TLDR")
-                    processed_comments.add(comment.id)
+                    mark_processed(comment.id, processed_comment_order, processed_comments)
                     continue
                 
                 try:
                     # Generate TLDR for the comment with context
-                    tldr_text, token_info = generate_comment_tldr(comment, submission, model)
+                    tldr_text, token_info = generate_comment_tldr(comment, submission, model, word_count)
                     
                     # Post reply to the comment
                     reply_text = f"**Comment TLDR:** {tldr_text}"
                     reply = comment.reply(reply_text)
                     
-                    print(f"     ✅ Posted Comment TLDR ({len(tldr_text.split())} words, {token_info['total_tokens']} tokens)")
+                    print(f"     ✅ Posted Comment TLDR ({len(tldr_text.split())} words, {token_info.total_tokens} tokens)")
                     
-                    processed_comments.add(comment.id)
+                    mark_processed(comment.id, processed_comment_order, processed_comments)
                     tldrs_generated += 1
                     state["daily_tldrs"] = state.get("daily_tldrs", 0) + 1
-                    total_tokens += token_info["total_tokens"]
-                    total_cost += token_info["cost"]
+                    total_tokens += token_info.total_tokens
+                    total_cost += token_info.cost
                     
                     # Only 1 TLDR per run
                     if tldrs_generated >= MAX_TLDR_PER_RUN:
@@ -654,8 +697,8 @@ def main():
     
     # Update state
     state["last_check"] = datetime.utcnow().timestamp()
-    state["processed_posts"] = list(processed_posts)[-1000:]  # Keep last 1000
-    state["processed_comments"] = list(processed_comments)[-2000:]  # Keep last 2000
+    state["processed_posts"] = list(processed_post_order)  # Oldest first, capped at PROCESSED_POSTS_LIMIT
+    state["processed_comments"] = list(processed_comment_order)  # Oldest first, capped at PROCESSED_COMMENTS_LIMIT
     state["comment_summaries"] = comment_summaries
     state["stats"]["total_posts_processed"] += 1
     state["stats"]["total_tldrs_generated"] += tldrs_generated